@@ -0,0 +1,65 @@
+"""Numeric kernels for the thermal model (pure Python, no Home Assistant imports)."""
+
+# Thermal model: dT/dt = -a * (T - T_ambient) + b * boiler_on   (per minute)
+# theta = [a (loss coefficient, 1/min), b (heating rate, C/min)], identified by RLS
+RLS_FORGETTING = 0.98
+RLS_INITIAL_COVARIANCE = ((1e-5, 0.0), (0.0, 1e-3))
+
+# Fixed number of RK4 steps across the preheat horizon
+WARMUP_SIM_STEPS = 60
+
+def rls_update(theta, cov, phi, y, lam=RLS_FORGETTING):
+    """One recursive least-squares step for the 2-parameter model. Returns (theta, cov)."""
+    p_phi = (
+        cov[0][0] * phi[0] + cov[0][1] * phi[1],
+        cov[1][0] * phi[0] + cov[1][1] * phi[1],
+    )
+    denom = lam + phi[0] * p_phi[0] + phi[1] * p_phi[1]
+    gain = (p_phi[0] / denom, p_phi[1] / denom)
+    error = y - (phi[0] * theta[0] + phi[1] * theta[1])
+
+    new_theta = [theta[0] + gain[0] * error, theta[1] + gain[1] * error]
+    new_cov = [[(cov[i][j] - gain[i] * p_phi[j]) / lam for j in range(2)] for i in range(2)]
+    return new_theta, new_cov
+
+def clamp_model(theta):
+    """Keep the identified parameters physically meaningful."""
+    return [max(0.0, min(0.1, theta[0])), max(0.01, min(1.0, theta[1]))]
+
+def learn_cycle(theta, cov, phi, y):
+    """RLS step plus clamping: the whole per-cycle learning update."""
+    theta, cov = rls_update(theta, cov, phi, y)
+    return clamp_model(theta), cov
+
+def ewma(old, observed, weight=0.2):
+    """Exponentially weighted moving average step."""
+    return old + (observed - old) * weight
+
+def replay_learning(cycles, min_burn, fallback_ambient, theta, cov):
+    """Feed a batch of historical boiler cycles, each with its own outside temp, through the RLS estimator."""
+    for duration_mins, start_temp, end_temp, ambient in cycles:
+        if duration_mins < min_burn: continue
+        if ambient is None: ambient = fallback_ambient
+        avg_error = (start_temp + end_temp) / 2.0 - ambient
+        theta, cov = learn_cycle(theta, cov, (-avg_error * duration_mins, duration_mins), end_temp - start_temp)
+    return theta, cov
+
+def simulate_warmup(start_temp, target_temp, ambient, loss_coeff, heat_rate, horizon):
+    """Minutes for the RC model to heat from start_temp to target_temp (RK4), capped at horizon."""
+    if start_temp >= target_temp: return 0.0
+
+    h = horizon / WARMUP_SIM_STEPS
+    temp = start_temp
+    for step in range(WARMUP_SIM_STEPS):
+        k1 = heat_rate - loss_coeff * (temp - ambient)
+        k2 = heat_rate - loss_coeff * (temp + 0.5 * h * k1 - ambient)
+        k3 = heat_rate - loss_coeff * (temp + 0.5 * h * k2 - ambient)
+        k4 = heat_rate - loss_coeff * (temp + h * k3 - ambient)
+        next_temp = temp + h * (k1 + 2 * k2 + 2 * k3 + k4) / 6.0
+
+        if next_temp >= target_temp:
+            # Interpolate inside the step that crosses the target
+            return h * (step + (target_temp - temp) / (next_temp - temp))
+        temp = next_temp
+
+    return horizon
@@ -1,6 +1,8 @@
 """The Core Logic for Smart Heating."""
 import logging
-from datetime import timedelta
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from functools import partial
 
 from homeassistant.components.climate import (
     ClimateEntity,
@@ -17,9 +19,10 @@ from homeassistant.const import (
     STATE_UNKNOWN,
 )
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_component import DATA_INSTANCES
 from homeassistant.helpers.event import (
+    async_call_later,
     async_track_state_change_event,
-    async_track_time_interval,
 )
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.util import dt as dt_util
@@ -32,6 +35,7 @@ from .const import (
     CONF_ENABLE_PREHEAT,
     CONF_ENABLE_OVERSHOOT,
     CONF_ENABLE_LEARNING,
+    CONF_LEARN_FROM_HISTORY,
     CONF_MAX_ON_TIME,
     CONF_MAX_PREHEAT_TIME,
     CONF_HYSTERESIS,
@@ -43,6 +47,7 @@ from .const import (
     CONF_WEATHER_SENSITIVITY,
     DEFAULT_HEAT_UP_RATE,
     DEFAULT_HEAT_LOSS_RATE,
+    DEFAULT_LOSS_COEFFICIENT,
     DEFAULT_OVERSHOOT,
     DEFAULT_HYSTERESIS,
     DEFAULT_MAX_ON_TIME,
@@ -52,17 +57,82 @@ from .const import (
     DEFAULT_SETBACK_TEMP,
     DEFAULT_MAX_HEAT_LOSS_TIME,
     DEFAULT_WEATHER_SENSITIVITY,
+    DEFAULT_HISTORY_DAYS,
+)
+from ._math import (
+    RLS_INITIAL_COVARIANCE,
+    clamp_model,
+    ewma,
+    learn_cycle,
+    replay_learning,
+    simulate_warmup,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
+_INVALID_STATES = frozenset({STATE_UNAVAILABLE, STATE_UNKNOWN})
+_HVAC_MODES = frozenset({HVACMode.HEAT, HVACMode.OFF})
+
+# How long a schedule snapshot stays valid (seconds) for attribute reads between ticks
+SCHEDULE_CACHE_TTL = 1.0
+
+# Upper bound (seconds) between control runs, even when no deadline is pending
+MAX_WAKEUP_INTERVAL = 300
+
+# Sensor/schedule events within this window (seconds) share one control run
+CONTROL_DEBOUNCE = 2
+
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up the Smart Heating platform."""
     async_add_entities([SmartThermostat(hass, config_entry)])
 
+def _numeric_series(states, from_attributes=False):
+    """(timestamps, values) for the recorder states that hold a temperature."""
+    times = []
+    values = []
+    for state in states:
+        # Weather entities keep the temperature in attributes; those changes only move last_updated
+        raw = state.attributes.get("temperature") if from_attributes else state.state
+        try:
+            values.append(float(raw))
+        except (TypeError, ValueError):
+            continue
+        times.append((state.last_updated if from_attributes else state.last_changed).timestamp())
+    return times, values
+
+def _value_at(series, ts):
+    """Most recent value at or before ts, or None."""
+    times, values = series
+    idx = bisect_right(times, ts) - 1
+    return values[idx] if idx >= 0 else None
+
+def _extract_cycles(heater_states, sensor_states, outside_states=(), outside_is_weather=False):
+    """Turn recorder history into (minutes, start temp, end temp, outside temp or None) per ON->OFF cycle."""
+    temps = _numeric_series(sensor_states)
+    outside = _numeric_series(outside_states, outside_is_weather)
+
+    cycles = []
+    on_ts = None
+    for state in heater_states:
+        ts = state.last_changed.timestamp()
+        if state.state == STATE_ON:
+            if on_ts is None: on_ts = ts
+        elif state.state == STATE_OFF and on_ts is not None:
+            start_temp = _value_at(temps, on_ts)
+            end_temp = _value_at(temps, ts)
+            if start_temp is not None and end_temp is not None:
+                cycles.append(((ts - on_ts) / 60.0, start_temp, end_temp, _value_at(outside, (on_ts + ts) / 2.0)))
+            on_ts = None
+        else:
+            on_ts = None # Unavailable/unknown breaks the cycle
+    return cycles
+
 class SmartThermostat(ClimateEntity, RestoreEntity):
     """Representation of a Smart Learning Thermostat."""
 
+    # Restored via RestoreEntity; keep the RLS state out of the recorder database
+    _unrecorded_attributes = frozenset({"learned_thermal_model"})
+
     def __init__(self, hass, config_entry):
         self.hass = hass
         self._config_entry = config_entry
@@ -89,16 +159,41 @@ class SmartThermostat(ClimateEntity, RestoreEntity):
         
         # Logic Flags
         self._manual_mode = False        
-        self._last_schedule_state = None 
+        self._last_schedule_state = None # Raw state string, kept for edge detection
+        self._sched_on = False
         self._preheat_latch = False
+        self._sched_cache = None # (loop_ts, state_str, parsed_next_event)
+        self._next_event_cache = (None, None) # (raw next_event, parsed UTC datetime)
+        self._outside_temp_cache = None # (value,) - read once per control tick
+        self._preheat_cache = None # (inputs, (minutes_needed, fire_time))
+        self._last_written_state = None
+        self._wakeup_handle = None
+        self._wakeup_at = 0.0 # Monotonic time the pending wakeup fires
+        self._run_unsub = None # Pending debounced control run
+        self._safety_handle = None
+        self._switch_component = None # Switch EntityComponent, resolved on first toggle
+        self._last_state_key = None # (rounded temp, boiler) at the end of the last full run
+        self._target_dirty = True # Recompute schedule/auto target on the next run
+        self._target_deadline = 0.0 # Monotonic time the auto target may next change
         
         # Learned Values (Persistent)
         self._heat_up_rate = DEFAULT_HEAT_UP_RATE
         self._heat_loss_rate = DEFAULT_HEAT_LOSS_RATE
         self._overshoot_temp = DEFAULT_OVERSHOOT
         self._outside_ref_temp = 10.0
+
+        # Attribute Cache (rebuilt only after _attr_version is bumped)
+        self._attr_version = 0
+        self._attr_cache_version = None
+        self._attr_cache_dict = None
+        self._next_fire_cache = None # (iso_str,) - computed lazily, once per tick
+        self._learned_attrs = None # Rounded learned values - rebuilt only when learning moves them
+
+        # Thermal Model (RLS estimate behind the learned rates)
+        self._model_theta = [DEFAULT_LOSS_COEFFICIENT, DEFAULT_HEAT_UP_RATE]
+        self._model_cov = [list(row) for row in RLS_INITIAL_COVARIANCE]
         
-        # Cycle Tracking (Heat Up)
+        # Cycle Tracking (Heat Up) - timestamps are hass.loop.time() seconds
         self._last_on_time = None
         self._heat_start_temp = None
         
@@ -108,6 +203,9 @@ class SmartThermostat(ClimateEntity, RestoreEntity):
         self._peak_temp_time = None       
         self._heat_loss_tracking_active = False 
 
+        # Switching Thresholds (refreshed on target/config change)
+        self._update_thresholds()
+
     def _load_config_options(self):
         """Read settings safely using constants."""
         options = self._config_entry.options
@@ -121,24 +219,43 @@ class SmartThermostat(ClimateEntity, RestoreEntity):
         self._sensor_entity_id = get_val(CONF_SENSOR)
         self._schedule_entity_id = get_val(CONF_SCHEDULE)
         self._outside_sensor_id = get_val(CONF_OUTSIDE_SENSOR) # <--- Added
+        self._is_outside_weather = bool(self._outside_sensor_id) and self._outside_sensor_id.startswith("weather.")
         
         # --- Toggles ---
         self._enable_preheat = get_val(CONF_ENABLE_PREHEAT, False)
         self._enable_overshoot = get_val(CONF_ENABLE_OVERSHOOT, False)
         self._enable_learning = get_val(CONF_ENABLE_LEARNING, False)
+        self._learn_from_history = get_val(CONF_LEARN_FROM_HISTORY, False)
         
         # --- Numeric Settings ---
         self._hysteresis = get_val(CONF_HYSTERESIS, DEFAULT_HYSTERESIS)
-        self._max_on_time = get_val(CONF_MAX_ON_TIME, DEFAULT_MAX_ON_TIME) * 60 
+        self._max_on_time = get_val(CONF_MAX_ON_TIME, DEFAULT_MAX_ON_TIME)
+        self._max_on_time_seconds = self._max_on_time * 60
         self._max_preheat_time = get_val(CONF_MAX_PREHEAT_TIME, DEFAULT_MAX_PREHEAT_TIME)
         self._min_burn_time = get_val(CONF_MIN_BURN_TIME, DEFAULT_MIN_BURN_TIME)
         self._max_heat_loss_time = get_val(CONF_MAX_HEAT_LOSS_TIME, DEFAULT_MAX_HEAT_LOSS_TIME)
         self._weather_sensitivity = get_val(CONF_WEATHER_SENSITIVITY, DEFAULT_WEATHER_SENSITIVITY) # <--- Added
+        self._ws_scale = self._weather_sensitivity / 100.0 # Penalty fraction per degree colder
         
         # --- Temperatures ---
         self._comfort_temp = get_val(CONF_COMFORT_TEMP, DEFAULT_COMFORT_TEMP)
         self._setback_temp = get_val(CONF_SETBACK_TEMP, DEFAULT_SETBACK_TEMP)
 
+        # --- Specialised Control Path ---
+        self._compute_auto_target = self._build_target_fn()
+
+    def _build_target_fn(self):
+        """Pick the auto-target routine for this configuration once, not every tick."""
+        if not self._schedule_entity_id: return self._auto_target_basic
+        if self._enable_preheat: return self._auto_target_preheat
+        return self._auto_target_schedule
+
+    def _update_thresholds(self):
+        """Recompute the boiler ON/OFF points from the current target."""
+        self._effective_overshoot = self._overshoot_temp if self._enable_overshoot else 0.0
+        self._off_point = self._target_temp - self._effective_overshoot
+        self._on_point = self._target_temp - self._hysteresis
+
     async def async_added_to_hass(self):
         """Run when entity is added."""
         await super().async_added_to_hass()
@@ -146,7 +263,7 @@ class SmartThermostat(ClimateEntity, RestoreEntity):
         # Restore State
         last_state = await self.async_get_last_state()
         if last_state:
-            self._hvac_mode = last_state.state if last_state.state in self._attr_hvac_modes else HVACMode.OFF
+            self._hvac_mode = last_state.state if last_state.state in _HVAC_MODES else HVACMode.OFF
             self._target_temp = last_state.attributes.get("target_temp", self._setback_temp)
             self._heat_up_rate = last_state.attributes.get("learned_heat_up_rate", DEFAULT_HEAT_UP_RATE)
             self._heat_loss_rate = last_state.attributes.get("learned_heat_loss_rate", DEFAULT_HEAT_LOSS_RATE)
@@ -154,6 +271,17 @@ class SmartThermostat(ClimateEntity, RestoreEntity):
             # Restore the context temp
             self._outside_ref_temp = last_state.attributes.get("learned_outside_ref_temp", 10.0)
 
+            model = last_state.attributes.get("learned_thermal_model")
+            if model:
+                self._model_theta = [model["loss_coefficient"], model["heat_rate"]]
+                self._model_cov = [list(row) for row in model["covariance"]]
+            else:
+                # Upgrade from the EWMA learner: keep the learned rate as the starting estimate
+                self._model_theta = clamp_model([DEFAULT_LOSS_COEFFICIENT, self._heat_up_rate])
+            self._learned_attrs = None
+            self._attr_version += 1
+            self._update_thresholds()
+
         # --- FIX: SYNC INTERNAL STATE WITH REALITY ---
         if self._heater_entity_id:
             current_switch_state = self.hass.states.get(self._heater_entity_id)
@@ -161,24 +289,76 @@ class SmartThermostat(ClimateEntity, RestoreEntity):
                 self._is_active_heating = True 
             else:
                 self._is_active_heating = False 
+            self._attr_version += 1
 
-        # Listeners
-        if self._sensor_entity_id:
+        # Listeners (one subscription for sensor + schedule, dispatched by entity_id)
+        tracked = [entity_id for entity_id in (self._sensor_entity_id, self._schedule_entity_id) if entity_id]
+        if tracked:
             self.async_on_remove(
-                async_track_state_change_event(self.hass, [self._sensor_entity_id], self._async_sensor_changed)
+                async_track_state_change_event(self.hass, tracked, self._async_state_event)
             )
         
-        if self._schedule_entity_id:
-             self.async_on_remove(
-                async_track_state_change_event(self.hass, [self._schedule_entity_id], self._async_control_loop_event)
-             )
-        
-        self.async_on_remove(
-            async_track_time_interval(self.hass, self._async_control_loop, timedelta(minutes=1))
-        )
+        self.async_on_remove(self._cancel_wakeup)
+        self.async_on_remove(self._cancel_scheduled_run)
+        self.async_on_remove(self._cancel_safety_shutoff)
+
+        # Seed from past boiler cycles only while the model has never been updated
+        # (an untouched covariance); never overrides live learning
+        if (
+            self._learn_from_history
+            and self._model_cov == [list(row) for row in RLS_INITIAL_COVARIANCE]
+            and self._heater_entity_id
+            and self._sensor_entity_id
+            and "recorder" in self.hass.config.components
+        ):
+            # Tied to the entry so an unload/reload cancels the recorder query
+            self._config_entry.async_create_background_task(
+                self.hass, self._async_learn_from_history(), f"{self.entity_id} history seed"
+            )
 
         await self._run_control_logic()
 
+    async def _async_learn_from_history(self):
+        """Replay boiler cycles stored by the recorder to seed the heat-up rate."""
+        from homeassistant.components.recorder import get_instance, history
+
+        entity_ids = [self._heater_entity_id, self._sensor_entity_id]
+        if self._outside_sensor_id: entity_ids.append(self._outside_sensor_id)
+
+        end_time = dt_util.utcnow()
+        start_time = end_time - timedelta(days=DEFAULT_HISTORY_DAYS)
+        states = await get_instance(self.hass).async_add_executor_job(
+            partial(
+                history.get_significant_states,
+                self.hass,
+                start_time,
+                end_time,
+                entity_ids,
+                significant_changes_only=False,
+                # Weather entities report the temperature as an attribute
+                no_attributes=not self._is_outside_weather,
+            )
+        )
+
+        cycles = _extract_cycles(
+            states.get(self._heater_entity_id, []),
+            states.get(self._sensor_entity_id, []),
+            states.get(self._outside_sensor_id, []) if self._outside_sensor_id else (),
+            self._is_outside_weather,
+        )
+        if not cycles:
+            _LOGGER.info("HISTORY: No completed boiler cycles found to learn from.")
+            return
+
+        # Cycles without a recorded outside temp fall back to today's ambient
+        ambient = self._get_ambient_temp()
+        self._model_theta, self._model_cov = replay_learning(
+            cycles, self._min_burn_time, ambient, self._model_theta, self._model_cov
+        )
+        self._apply_thermal_model(ambient)
+        _LOGGER.info("HISTORY: Replayed %d boiler cycles. Seeded Rate: %.4f", len(cycles), self._heat_up_rate)
+        self.async_write_ha_state()
+
     # --- PROPERTIES ---
     @property
     def min_temp(self): return 5.0
@@ -205,31 +385,57 @@ class SmartThermostat(ClimateEntity, RestoreEntity):
     @property
     def hvac_mode(self): return self._hvac_mode
     
+    @property
+    def next_fire_timestamp(self):
+        """Predicted next boiler start, computed at most once per control tick."""
+        if self._next_fire_cache is None:
+            self._next_fire_cache = (self._calculate_next_fire_time(),)
+        return self._next_fire_cache[0]
+
     @property
     def extra_state_attributes(self):
-        return {
-            "learned_heat_up_rate": round(self._heat_up_rate, 4),
-            "learned_heat_loss_rate": round(self._heat_loss_rate, 4),
-            "learned_overshoot": round(self._overshoot_temp, 2),
-            "learned_outside_ref_temp": round(self._outside_ref_temp, 1), # <--- Added
-            "weather_sensitivity": self._weather_sensitivity, # <--- Added
-            "boiler_active": self._is_active_heating,
-            "hysteresis": self._hysteresis,
-            "manual_mode": self._manual_mode,
-            "preheat_latch": self._preheat_latch,
-            "next_fire_timestamp": self._calculate_next_fire_time(),
-        }
+        if self._attr_cache_version != self._attr_version:
+            if self._learned_attrs is None:
+                # Learning moves these a few times a day; temperature ticks shouldn't re-round them
+                self._learned_attrs = {
+                    "learned_heat_up_rate": round(self._heat_up_rate, 4),
+                    "learned_heat_loss_rate": round(self._heat_loss_rate, 4),
+                    "learned_overshoot": round(self._overshoot_temp, 2),
+                    "learned_outside_ref_temp": round(self._outside_ref_temp, 1), # <--- Added
+                    "learned_thermal_model": {
+                        "loss_coefficient": self._model_theta[0],
+                        "heat_rate": self._model_theta[1],
+                        "covariance": self._model_cov,
+                    },
+                }
+            self._attr_cache_dict = {
+                **self._learned_attrs,
+                "weather_sensitivity": self._weather_sensitivity, # <--- Added
+                "boiler_active": self._is_active_heating,
+                "hysteresis": self._hysteresis,
+                "manual_mode": self._manual_mode,
+                "preheat_latch": self._preheat_latch,
+                "next_fire_timestamp": self.next_fire_timestamp,
+            }
+            self._attr_cache_version = self._attr_version
+        return self._attr_cache_dict
 
     # --- HELPER: GET OUTSIDE TEMP ---
     def _get_outside_temp(self):
+        """Outside temp for the current control tick (one state lookup per tick)."""
+        if self._outside_temp_cache is None:
+            self._outside_temp_cache = (self._read_outside_temp(),)
+        return self._outside_temp_cache[0]
+
+    def _read_outside_temp(self):
         """Smartly fetch outside temp from Sensor OR Weather entity."""
         if not self._outside_sensor_id: return None
         
         state = self.hass.states.get(self._outside_sensor_id)
-        if not state or state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN): return None
+        if not state or state.state in _INVALID_STATES: return None
         
         # If it's a weather entity, look in attributes
-        if self._outside_sensor_id.startswith("weather."):
+        if self._is_outside_weather:
             return state.attributes.get("temperature")
         
         # Otherwise assume it's a sensor state
@@ -238,6 +444,11 @@ class SmartThermostat(ClimateEntity, RestoreEntity):
         except ValueError:
             return None
 
+    def _get_ambient_temp(self, current_outside=None):
+        """Outside temp for the thermal model, falling back to the learned reference."""
+        if current_outside is None: current_outside = self._get_outside_temp()
+        return current_outside if current_outside is not None else self._outside_ref_temp
+
     # --- CONTROL METHODS ---
 
     async def async_set_temperature(self, **kwargs):
@@ -245,13 +456,21 @@ class SmartThermostat(ClimateEntity, RestoreEntity):
         if (temp := kwargs.get(ATTR_TEMPERATURE)) is not None:
             self._target_temp = temp
             self._manual_mode = True 
+            self._target_dirty = True
+            self._attr_version += 1
+            self._update_thresholds()
             self.async_write_ha_state()
             await self._run_control_logic()
 
     async def async_set_hvac_mode(self, hvac_mode):
         self._hvac_mode = hvac_mode
+        self._target_dirty = True
         if hvac_mode == HVACMode.OFF:
             await self._set_boiler(False)
+            # Published outside a control run: refresh the prediction and the write signature
+            self._next_fire_cache = None
+            self._last_written_state = self._state_signature()
+            self._attr_version += 1
         self.async_write_ha_state()
         await self._run_control_logic()
 
@@ -263,93 +482,121 @@ class SmartThermostat(ClimateEntity, RestoreEntity):
     # --- LOGIC HANDLERS ---
 
     @callback
-    async def _async_sensor_changed(self, event):
-        new_state = event.data.get("new_state")
-        if new_state is None or new_state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN): return
+    def _async_state_event(self, event):
+        if event.data["entity_id"] == self._sensor_entity_id:
+            self._async_sensor_changed(event)
+        else:
+            self._async_control_loop_event(event)
+
+    @callback
+    def _async_sensor_changed(self, event):
+        # unavailable/unknown fail float() just like any other junk; removal gives new_state None
         try:
-            self._current_temp = float(new_state.state)
-            
-            if self._enable_learning and not self._is_active_heating:
-                self._update_off_cycle_stats()
-                
-            await self._run_control_logic()
-        except ValueError: pass
+            self._current_temp = float(event.data["new_state"].state)
+        except (AttributeError, ValueError): return
+
+        if self._enable_learning and not self._is_active_heating:
+            self._update_off_cycle_stats(self.hass.loop.time())
+
+        self._schedule_run()
 
     @callback
-    async def _async_control_loop_event(self, event):
+    def _async_control_loop_event(self, event):
+        self._target_dirty = True
+        self._schedule_run()
+
+    @callback
+    def _schedule_run(self):
+        """Coalesce bursts of events into a single control run."""
+        if self._run_unsub: return
+        self._run_unsub = async_call_later(self.hass, CONTROL_DEBOUNCE, self._async_debounced_run)
+
+    @callback
+    def _cancel_scheduled_run(self):
+        if self._run_unsub:
+            self._run_unsub()
+            self._run_unsub = None
+
+    async def _async_debounced_run(self, now=None):
+        self._run_unsub = None
         await self._run_control_logic()
 
     async def _async_control_loop(self, now=None): 
+        self._wakeup_handle = None
+        self._target_dirty = True
         await self._run_control_logic()
 
+    @callback
+    def _cancel_wakeup(self):
+        if self._wakeup_handle:
+            self._wakeup_handle()
+            self._wakeup_handle = None
+
+    @callback
+    def _schedule_wakeup(self, delay, now_ts):
+        """Make sure a wakeup fires no later than the next deadline (capped)."""
+        delay = max(1.0, min(delay, MAX_WAKEUP_INTERVAL))
+        # A pending wakeup that already fires in time is kept rather than re-armed
+        if self._wakeup_handle and self._wakeup_at <= now_ts + delay: return
+
+        self._cancel_wakeup()
+        self._wakeup_at = now_ts + delay
+        self._wakeup_handle = async_call_later(self.hass, delay, self._async_control_loop)
+
     async def _run_control_logic(self):
         """The brain of the thermostat (Single Source of Truth)."""
         if self._current_temp is None or self._hvac_mode == HVACMode.OFF:
+            # Nothing to wait for: the next sensor update or mode change restarts the loop
             await self._set_boiler(False)
+            self._cancel_wakeup()
             return
 
-        now = dt_util.now()
-
-        # --- 1. DETECT SCHEDULE CHANGES ---
-        if self._schedule_entity_id:
-            sched_state = self.hass.states.get(self._schedule_entity_id)
-            current_state = sched_state.state if sched_state else STATE_OFF
-            
-            if self._last_schedule_state and current_state != self._last_schedule_state:
-                _LOGGER.info(f"Schedule changed to {current_state}. Resetting Auto/Manual/Latch.")
-                self._manual_mode = False 
-                if current_state == STATE_ON:
-                    self._preheat_latch = False 
-            
-            self._last_schedule_state = current_state
-
-        # --- 2. CALCULATE "AUTO" TARGET ---
-        if not self._manual_mode:
-            new_target = self._setback_temp
-            self._attr_preset_mode = "none"
+        # Nothing moved since the last run: thresholds, target and timers all still hold
+        if not self._target_dirty and self._last_state_key == (round(self._current_temp, 2), self._is_active_heating):
+            return
 
-            if self._schedule_entity_id and self._last_schedule_state == STATE_ON:
-                new_target = self._comfort_temp
-            
-            elif self._enable_preheat and self._schedule_entity_id:
-                next_start = self._get_next_schedule_start()
+        now_ts = self.hass.loop.time()
+        now = None
+        next_wakeup = MAX_WAKEUP_INTERVAL
+        self._outside_temp_cache = None
+
+        # Sections 1-2 only run after a schedule event, user change or wakeup;
+        # plain sensor updates go straight to boiler control.
+        if self._target_dirty:
+            self._target_dirty = False
+            now = dt_util.now()
+            target_wakeup = MAX_WAKEUP_INTERVAL
+
+            # --- 1. DETECT SCHEDULE CHANGES ---
+            if self._schedule_entity_id:
+                _, sched_state, _ = self._refresh_schedule_cache()
+                current_state = sched_state if sched_state is not None else STATE_OFF
+                self._sched_on = current_state == STATE_ON
                 
-                should_preheat = False
+                if self._last_schedule_state and current_state != self._last_schedule_state:
+                    _LOGGER.info("Schedule changed to %s. Resetting Auto/Manual/Latch.", current_state)
+                    self._manual_mode = False 
+                    if self._sched_on:
+                        self._preheat_latch = False 
                 
-                if self._preheat_latch:
-                    should_preheat = True 
-                elif next_start:
-                    diff = self._comfort_temp - self._current_temp
-                    if diff > 0:
-                        adjusted_rate = self._heat_up_rate
-                        current_outside = self._get_outside_temp()
-                        
-                        if current_outside is not None and self._weather_sensitivity > 0:
-                            delta_outside = self._outside_ref_temp - current_outside
-                            if delta_outside > 0:
-                                penalty_factor = (delta_outside * self._weather_sensitivity) / 100.0
-                                penalty_factor = min(0.8, penalty_factor)
-                                adjusted_rate = self._heat_up_rate * (1.0 - penalty_factor)
-                                _LOGGER.debug(f"PREHEAT: Outside is {delta_outside}C colder. Applying {round(penalty_factor*100,1)}% penalty.")
-
-                        minutes_needed = diff / adjusted_rate
-                        minutes_needed = min(minutes_needed, self._max_preheat_time)
-                        
-                        if now >= (next_start - timedelta(minutes=minutes_needed)):
-                            should_preheat = True
-                            _LOGGER.info(f"Preheat Triggered (Latched ON). Est Time: {round(minutes_needed)}m")
-                            self._preheat_latch = True
-
-                if should_preheat:
-                    new_target = self._comfort_temp
-                    self._attr_preset_mode = "preheat"
-            
-            self._target_temp = new_target
+                self._last_schedule_state = current_state
+
+            # --- 2. CALCULATE "AUTO" TARGET ---
+            if not self._manual_mode:
+                new_target, self._attr_preset_mode, target_wakeup = self._compute_auto_target(now)
+                
+                if new_target != self._target_temp:
+                    self._target_temp = new_target
+                    self._update_thresholds()
+
+            # The wakeup timer lands on the preheat trigger time and re-dirties the target
+            self._target_deadline = now_ts + target_wakeup
+
+        next_wakeup = min(next_wakeup, self._target_deadline - now_ts)
 
         # --- 3. BOILER CONTROL ---
-        overshoot = self._overshoot_temp if self._enable_overshoot else 0.0
-        off_point = self._target_temp - overshoot
-        on_point = self._target_temp - self._hysteresis
+        off_point = self._off_point
+        on_point = self._on_point
         
         heater_is_physically_on = False
         if self._heater_entity_id:
@@ -359,54 +606,197 @@ class SmartThermostat(ClimateEntity, RestoreEntity):
 
         if self._is_active_heating:
             if self._current_temp >= off_point:
-                _LOGGER.info(f"Target reached ({self._current_temp} >= {off_point}). Boiler OFF.")
-                await self._set_boiler(False)
-            elif self._last_on_time and (now.timestamp() - self._last_on_time) > self._max_on_time:
-                _LOGGER.warning("Safety: Max boiler runtime exceeded. Forcing OFF.")
-                await self._set_boiler(False)
+                _LOGGER.info("Target reached (%s >= %s). Boiler OFF.", self._current_temp, off_point)
+                await self._set_boiler(False, now_ts)
             else:
                 if not heater_is_physically_on:
                     _LOGGER.warning("WATCHDOG: Thermostat is Active, but Switch is OFF. Forcing Sync (ON).")
-                    await self.hass.services.async_call("switch", "turn_on", {"entity_id": self._heater_entity_id})
+                    await self._async_switch_heater(True)
         else:
             if self._current_temp <= on_point:
-                 _LOGGER.info(f"Demand detected ({self._current_temp} <= {on_point}). Boiler ON.")
-                 await self._set_boiler(True)
+                 _LOGGER.info("Demand detected (%s <= %s). Boiler ON.", self._current_temp, on_point)
+                 await self._set_boiler(True, now_ts)
             else:
                  if heater_is_physically_on:
                      _LOGGER.warning("WATCHDOG: Thermostat is Idle, but Switch is ON. Forcing Sync (OFF).")
-                     await self.hass.services.async_call("switch", "turn_off", {"entity_id": self._heater_entity_id})
+                     await self._async_switch_heater(False)
+
+        self._schedule_wakeup(next_wakeup, now_ts)
+        self._last_state_key = (round(self._current_temp, 2), self._is_active_heating)
+
+        # Only push to HA (recorder/websocket/automations) when something visible changed
+        written_state = self._state_signature()
+        if written_state != self._last_written_state:
+            self._last_written_state = written_state
+            # Latch, manual flag and the fire prediction may have moved since the last write;
+            # reuse this tick's wall clock when the target section already read it
+            self._next_fire_cache = None if now is None else (self._calculate_next_fire_time(now),)
+            self._attr_version += 1
+            self.async_write_ha_state()
 
-        self.async_write_ha_state()
+    def _state_signature(self):
+        """Tuple of the values that make up the published state."""
+        return (
+            self._hvac_mode,
+            self._is_active_heating,
+            self._target_temp,
+            self._current_temp,
+            self._attr_preset_mode,
+            self._preheat_latch,
+            self._manual_mode,
+            self._last_schedule_state,
+            # Parsed next schedule start: a moved next_event changes the fire prediction
+            self._sched_cache[2] if self._sched_cache else None,
+            self._heat_up_rate,
+            self._heat_loss_rate,
+            self._overshoot_temp,
+            self._outside_ref_temp,
+        )
+
+    # --- AUTO TARGET ROUTINES (selected by _build_target_fn) ---
+    # Each returns (target, preset_mode, seconds until the result could change)
+
+    def _auto_target_basic(self, now):
+        """No schedule: hold the setback temperature."""
+        return self._setback_temp, "none", MAX_WAKEUP_INTERVAL
+
+    def _auto_target_schedule(self, now):
+        """Schedule without preheat: comfort while the schedule is ON."""
+        if self._sched_on:
+            return self._comfort_temp, "none", MAX_WAKEUP_INTERVAL
+        return self._setback_temp, "none", MAX_WAKEUP_INTERVAL
+
+    def _auto_target_preheat(self, now):
+        """Schedule with preheat: start early enough to hit comfort on time."""
+        if self._sched_on:
+            return self._comfort_temp, "none", MAX_WAKEUP_INTERVAL
+        if self._preheat_latch:
+            return self._comfort_temp, "preheat", MAX_WAKEUP_INTERVAL
+
+        next_start = self._get_next_schedule_start()
+        if not next_start:
+            return self._setback_temp, "none", MAX_WAKEUP_INTERVAL
+        wakeup = (next_start - now).total_seconds()
+
+        diff = self._comfort_temp - self._current_temp
+        if diff > 0:
+            minutes_needed, trigger_time = self._preheat_estimate(self._current_temp, next_start)
+            if now >= trigger_time:
+                _LOGGER.info("Preheat Triggered (Latched ON). Est Time: %.0fm", minutes_needed)
+                self._preheat_latch = True
+                return self._comfort_temp, "preheat", MAX_WAKEUP_INTERVAL
+            wakeup = min(wakeup, (trigger_time - now).total_seconds())
+
+        return self._setback_temp, "none", wakeup
+
+    def _adjusted_heat_up_rate(self, outside_temp):
+        """Heating rate after the weather-sensitivity penalty, as (rate, penalty_factor)."""
+        if outside_temp is None or self._ws_scale <= 0:
+            return self._heat_up_rate, 0.0
+
+        delta_outside = self._outside_ref_temp - outside_temp
+        if delta_outside <= 0:
+            return self._heat_up_rate, 0.0
+
+        penalty_factor = min(0.8, delta_outside * self._ws_scale)
+        return self._heat_up_rate * (1.0 - penalty_factor), penalty_factor
+
+    def _preheat_estimate(self, current_temp, next_start):
+        """(minutes_needed, fire_time) to reach comfort by next_start, reused while inputs are unchanged."""
+        current_outside = self._get_outside_temp()
+        inputs = (current_temp, next_start, current_outside, self._outside_ref_temp, tuple(self._model_theta))
+        if self._preheat_cache and self._preheat_cache[0] == inputs:
+            return self._preheat_cache[1]
+
+        loss_coeff = self._model_theta[0]
+        if loss_coeff > 0:
+            # The model's loss term already slows warm-up against the current outside temp
+            adjusted_rate = self._heat_up_rate
+        else:
+            # No loss term learned yet: the weather-sensitivity penalty is the only cold-weather correction
+            adjusted_rate, penalty_factor = self._adjusted_heat_up_rate(current_outside)
+            if penalty_factor:
+                _LOGGER.debug("PREHEAT: Outside is %sC colder. Applying %.1f%% penalty.", self._outside_ref_temp - current_outside, penalty_factor * 100)
+
+        minutes_needed = simulate_warmup(
+            current_temp, self._comfort_temp, self._get_ambient_temp(current_outside),
+            loss_coeff, adjusted_rate, self._max_preheat_time,
+        )
+        estimate = (minutes_needed, next_start - timedelta(minutes=minutes_needed))
+        self._preheat_cache = (inputs, estimate)
+        return estimate
 
-    async def _set_boiler(self, turn_on):
+    async def _set_boiler(self, turn_on, now_ts=None):
         if not self._heater_entity_id: return
+        if now_ts is None: now_ts = self.hass.loop.time()
 
         if turn_on and not self._is_active_heating:
             if self._enable_learning and not self._is_active_heating:
-                 self._finalize_heat_loss_learning()
+                 self._finalize_heat_loss_learning(now_ts)
 
             self._is_active_heating = True
-            self._last_on_time = dt_util.now().timestamp()
+            self._attr_version += 1
+            self._last_on_time = now_ts
+            self._safety_handle = async_call_later(
+                self.hass, self._max_on_time_seconds, self._async_safety_shutoff
+            )
             self._heat_start_temp = self._current_temp
             
-            await self.hass.services.async_call("switch", "turn_on", {"entity_id": self._heater_entity_id})
+            await self._async_switch_heater(True)
             
         elif not turn_on and self._is_active_heating:
             self._is_active_heating = False
+            self._attr_version += 1
+            self._cancel_safety_shutoff()
             
-            await self.hass.services.async_call("switch", "turn_off", {"entity_id": self._heater_entity_id})
+            await self._async_switch_heater(False)
             
             if self._enable_learning:
-                self._learn_heat_up_rate()
-                self._last_off_time = dt_util.now().timestamp()
+                self._learn_heat_up_rate(now_ts)
+                self._last_off_time = now_ts
                 self._peak_temp_observed = self._current_temp
-                self._peak_temp_time = dt_util.now().timestamp()
+                self._peak_temp_time = now_ts
                 self._heat_loss_tracking_active = True 
 
-    def _update_off_cycle_stats(self):
+    async def _async_switch_heater(self, turn_on):
+        """Toggle the boiler switch, skipping the service layer when the entity is reachable."""
+        if self._switch_component is None:
+            self._switch_component = self.hass.data.get(DATA_INSTANCES, {}).get("switch")
+
+        entity = self._switch_component.get_entity(self._heater_entity_id) if self._switch_component else None
+        if entity is None or not entity.available:
+            # Not a local switch entity, not loaded yet or unavailable - let the service layer decide
+            service = "turn_on" if turn_on else "turn_off"
+            await self.hass.services.async_call("switch", service, {"entity_id": self._heater_entity_id})
+            return
+
+        # async_request_call honours the platform's PARALLEL_UPDATES, like the service handler
+        if turn_on:
+            await entity.async_request_call(entity.async_turn_on())
+        else:
+            await entity.async_request_call(entity.async_turn_off())
+        if entity.should_poll:
+            # Mirror the service handler: polled entities don't push their own state
+            await entity.async_update_ha_state(True)
+
+    @callback
+    def _cancel_safety_shutoff(self):
+        if self._safety_handle:
+            self._safety_handle()
+            self._safety_handle = None
+
+    async def _async_safety_shutoff(self, now=None):
+        """Fires exactly _max_on_time after the boiler was switched on."""
+        self._safety_handle = None
+        if not self._is_active_heating: return
+        _LOGGER.warning("Safety: Max boiler runtime exceeded. Forcing OFF.")
+        await self._set_boiler(False)
+        self._next_fire_cache = None
+        self._last_written_state = self._state_signature()
+        self.async_write_ha_state()
+
+    def _update_off_cycle_stats(self, now_ts):
         if not self._peak_temp_observed or not self._current_temp: return
-        now_ts = dt_util.now().timestamp()
         
         if self._current_temp > self._peak_temp_observed:
             self._peak_temp_observed = self._current_temp
@@ -415,103 +805,129 @@ class SmartThermostat(ClimateEntity, RestoreEntity):
         if self._heat_loss_tracking_active:
             duration_mins = (now_ts - self._peak_temp_time) / 60.0
             if duration_mins >= self._max_heat_loss_time:
-                _LOGGER.info(f"Heat Loss Limit ({self._max_heat_loss_time}m) reached. Capping calculation.")
-                self._finalize_heat_loss_learning()
+                _LOGGER.info("Heat Loss Limit (%sm) reached. Capping calculation.", self._max_heat_loss_time)
+                self._finalize_heat_loss_learning(now_ts)
                 self._heat_loss_tracking_active = False 
 
-    def _finalize_heat_loss_learning(self):
+    def _finalize_heat_loss_learning(self, now_ts):
         if not self._peak_temp_observed or not self._peak_temp_time or not self._current_temp: return
         if not self._heat_loss_tracking_active: return 
 
-        now_ts = dt_util.now().timestamp()
         duration_mins = (now_ts - self._peak_temp_time) / 60.0
         
         if duration_mins < 30: return 
         delta_temp = self._peak_temp_observed - self._current_temp
-        if delta_temp < 0.2: return 
 
-        calculated_rate = delta_temp / duration_mins
-        new_rate = (self._heat_loss_rate * 0.8) + (calculated_rate * 0.2)
-        self._heat_loss_rate = max(0.001, min(0.5, new_rate))
+        # Free cooling: no heating term, only the loss towards ambient
+        ambient = self._get_ambient_temp()
+        avg_error = (self._peak_temp_observed + self._current_temp) / 2.0 - ambient
+        self._update_thermal_model((-avg_error * duration_mins, 0.0), -delta_temp, ambient)
         
-        _LOGGER.info(f"LEARNING: Heat Loss Rate updated to {round(self._heat_loss_rate, 4)} (Delta {round(delta_temp,2)}C over {round(duration_mins,0)}m)")
+        _LOGGER.info(
+            "LEARNING: Heat Loss Rate updated to %.4f (Delta %.2fC over %.0fm)",
+            self._heat_loss_rate, delta_temp, duration_mins,
+        )
 
-    def _learn_heat_up_rate(self):
+    def _learn_heat_up_rate(self, now_ts):
         """Update Rate AND Reference Temp."""
         if not self._last_on_time or not self._heat_start_temp or not self._current_temp:
             return
 
-        now_ts = dt_util.now().timestamp()
         duration_mins = (now_ts - self._last_on_time) / 60.0
         delta_temp = self._current_temp - self._heat_start_temp
         
-        _LOGGER.info(f"DEBUG: Boiler ran for {round(duration_mins, 1)} min. Temp changed by {round(delta_temp, 2)}C.")
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Boiler ran for %.1f min. Temp changed by %.2fC.", duration_mins, delta_temp)
 
         if duration_mins < self._min_burn_time: 
-            _LOGGER.info(f"Learning Aborted: Burn time {round(duration_mins, 1)}m is less than minimum {self._min_burn_time}m.")
+            _LOGGER.info("Learning Aborted: Burn time %.1fm is less than minimum %sm.", duration_mins, self._min_burn_time)
             return 
         
-        if delta_temp < 0.2: 
-            _LOGGER.info(f"Learning Aborted: Temp rise {round(delta_temp, 2)}C is too small (min 0.2C).")
-            return
-        
-        calculated_rate = delta_temp / duration_mins
-        new_rate = (self._heat_up_rate * 0.8) + (calculated_rate * 0.2)
-        self._heat_up_rate = max(0.01, min(1.0, new_rate))
-        
         current_outside = self._get_outside_temp()
+        ambient = self._get_ambient_temp(current_outside)
+        avg_error = (self._heat_start_temp + self._current_temp) / 2.0 - ambient
+        self._update_thermal_model((-avg_error * duration_mins, duration_mins), delta_temp, ambient)
+        
         if current_outside is not None:
-            new_ref = (self._outside_ref_temp * 0.8) + (current_outside * 0.2)
-            self._outside_ref_temp = new_ref
-            _LOGGER.info(f"LEARNING SUCCESS! Rate: {round(self._heat_up_rate, 4)} | Ref Outside Temp: {round(self._outside_ref_temp, 1)}C")
+            self._outside_ref_temp = ewma(self._outside_ref_temp, current_outside)
+            self._learned_attrs = None
+            self._attr_version += 1
+            _LOGGER.info("LEARNING SUCCESS! Rate: %.4f | Ref Outside Temp: %.1fC", self._heat_up_rate, self._outside_ref_temp)
         else:
-            _LOGGER.info(f"LEARNING SUCCESS! Rate: {round(self._heat_up_rate, 4)} (No outside temp available)")
+            _LOGGER.info("LEARNING SUCCESS! Rate: %.4f (No outside temp available)", self._heat_up_rate)
+
+    def _update_thermal_model(self, phi, delta_temp, ambient):
+        """Feed one observed cycle into the RLS estimator."""
+        self._model_theta, self._model_cov = learn_cycle(self._model_theta, self._model_cov, phi, delta_temp)
+        self._apply_thermal_model(ambient)
+
+    def _apply_thermal_model(self, ambient):
+        """Derive the published rates from the identified model."""
+        loss_coeff, heat_rate = self._model_theta
+        self._heat_up_rate = heat_rate
+        self._heat_loss_rate = loss_coeff * (self._comfort_temp - ambient)
+        self._learned_attrs = None
+        self._attr_version += 1
 
     def _track_overshoot_peak(self):
         pass
 
+    def _refresh_schedule_cache(self):
+        """Snapshot the schedule state and its parsed next_event (UTC) for this tick."""
+        state = self.hass.states.get(self._schedule_entity_id)
+        sched_state = None
+        next_start = None
+        if state:
+            sched_state = state.state
+            next_event = state.attributes.get("next_event")
+            if next_event:
+                next_start = self._parse_next_event(next_event)
+
+        self._sched_cache = (self.hass.loop.time(), sched_state, next_start)
+        return self._sched_cache
+
+    def _parse_next_event(self, next_event):
+        """Parse next_event, reusing the previous result while the schedule hasn't advanced."""
+        raw, parsed = self._next_event_cache
+        if next_event is raw or next_event == raw: return parsed
+
+        # Schedule helpers usually store a datetime already; only strings need the regex parse
+        parsed = next_event if isinstance(next_event, datetime) else dt_util.parse_datetime(str(next_event))
+        if parsed: parsed = dt_util.as_utc(parsed)
+        self._next_event_cache = (next_event, parsed)
+        return parsed
+
+    def _get_schedule_snapshot(self):
+        """Return (state_str, next_start), reusing the tick snapshot while it is fresh."""
+        cache = self._sched_cache
+        if cache is None or (self.hass.loop.time() - cache[0]) >= SCHEDULE_CACHE_TTL:
+            cache = self._refresh_schedule_cache()
+        return cache[1], cache[2]
+
     def _get_next_schedule_start(self):
         if not self._schedule_entity_id: return None
-        state = self.hass.states.get(self._schedule_entity_id)
-        if not state: return None
-        next_event = state.attributes.get("next_event")
-        if next_event: return dt_util.parse_datetime(str(next_event))
-        return None
+        return self._get_schedule_snapshot()[1]
 
-    def _calculate_next_fire_time(self):
-        if self._is_active_heating: return dt_util.now().isoformat()
+    def _calculate_next_fire_time(self, now=None):
+        if self._is_active_heating or (self._schedule_entity_id and self._sched_on):
+            return (now or dt_util.now()).isoformat()
         
-        if self._schedule_entity_id:
-             sched_state = self.hass.states.get(self._schedule_entity_id)
-             if sched_state and sched_state.state == STATE_ON:
-                 return dt_util.now().isoformat()
+        if not self._schedule_entity_id: return None
 
         next_sched = self._get_next_schedule_start()
+
         if not next_sched: return None
         
-        if not self._enable_preheat: return next_sched.isoformat()
+        if not self._enable_preheat: return dt_util.as_local(next_sched).isoformat()
             
         current = self._current_temp if self._current_temp is not None else self._setback_temp
         diff = self._comfort_temp - current 
         
-        if diff <= 0: return next_sched.isoformat()
-        
-        # --- SENSITIVITY LOGIC ---
-        adjusted_rate = self._heat_up_rate
-        current_outside = self._get_outside_temp()
+        if diff <= 0: return dt_util.as_local(next_sched).isoformat()
         
-        if current_outside is not None and self._weather_sensitivity > 0:
-             delta_outside = self._outside_ref_temp - current_outside
-             if delta_outside > 0:
-                 penalty_factor = (delta_outside * self._weather_sensitivity) / 100.0
-                 penalty_factor = min(0.8, penalty_factor)
-                 adjusted_rate = self._heat_up_rate * (1.0 - penalty_factor)
-
-        minutes_needed = diff / adjusted_rate
-        minutes_needed = min(minutes_needed, self._max_preheat_time)
-        fire_time = next_sched - timedelta(minutes=minutes_needed)
+        _, fire_time = self._preheat_estimate(current, next_sched)
         
-        now = dt_util.now()
+        if now is None: now = dt_util.now()
         if fire_time < now: return now.isoformat()
 
-        return fire_time.isoformat()
+        return dt_util.as_local(fire_time).isoformat()
@@ -1,3 +1,6 @@
+from collections import ChainMap
+from functools import cache
+
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
@@ -19,6 +22,7 @@ from .const import (
     CONF_ENABLE_PREHEAT,
     CONF_ENABLE_OVERSHOOT,
     CONF_ENABLE_LEARNING,
+    CONF_LEARN_FROM_HISTORY,
     CONF_OUTSIDE_SENSOR,      # <--- Added
     CONF_WEATHER_SENSITIVITY, # <--- Added
     DEFAULT_COMFORT_TEMP,
@@ -31,6 +35,80 @@ from .const import (
     DEFAULT_WEATHER_SENSITIVITY, # <--- Added
 )
 
+# --- Static selectors (built once at import and shared by fields with the same config;
+# per-entry values go on the schema keys) ---
+_HEATER_SELECTOR = selector.EntitySelector(selector.EntitySelectorConfig(domain="switch"))
+_SENSOR_SELECTOR = selector.EntitySelector(selector.EntitySelectorConfig(domain="sensor"))
+_SCHEDULE_SELECTOR = selector.EntitySelector(
+    selector.EntitySelectorConfig(domain=["schedule", "calendar", "switch"])
+)
+_OUTSIDE_SELECTOR = selector.EntitySelector(selector.EntitySelectorConfig(domain=["sensor", "weather"]))
+
+_TEMP_SELECTOR = selector.NumberSelector(
+    selector.NumberSelectorConfig(min=0, max=30, step=0.5, unit_of_measurement="°C", mode=selector.NumberSelectorMode.BOX)
+)
+_HYSTERESIS_SELECTOR = selector.NumberSelector(
+    selector.NumberSelectorConfig(min=0.1, max=5.0, step=0.1, unit_of_measurement="°C", mode=selector.NumberSelectorMode.BOX)
+)
+
+_DURATION_SELECTOR = selector.NumberSelector(
+    selector.NumberSelectorConfig(min=1, max=300, unit_of_measurement="min", mode=selector.NumberSelectorMode.BOX)
+)
+_MIN_BURN_TIME_SELECTOR = selector.NumberSelector(
+    selector.NumberSelectorConfig(min=1, max=60, unit_of_measurement="min", mode=selector.NumberSelectorMode.BOX)
+)
+_MAX_HEAT_LOSS_TIME_SELECTOR = selector.NumberSelector(
+    selector.NumberSelectorConfig(min=60, max=1440, unit_of_measurement="min", mode=selector.NumberSelectorMode.BOX)
+)
+
+_WEATHER_SENSITIVITY_SELECTOR = selector.NumberSelector(
+    selector.NumberSelectorConfig(min=0, max=5.0, step=0.5, unit_of_measurement="%", mode=selector.NumberSelectorMode.SLIDER)
+)
+
+_TOGGLE_SELECTOR = selector.BooleanSelector()
+
+# --- Static schemas ---
+@cache
+def _user_schema():
+    """Initial-setup schema, compiled the first time the setup form is shown."""
+    return vol.Schema({
+        vol.Required("name", default="Smart Heating"): str,
+        vol.Required(CONF_HEATER): _HEATER_SELECTOR,
+        vol.Required(CONF_SENSOR): _SENSOR_SELECTOR,
+        vol.Optional(CONF_SCHEDULE): _SCHEDULE_SELECTOR,
+    })
+
+# Entity pickers carry no defaults, only per-entry suggestions
+_ENTITY_FIELDS = (
+    (CONF_HEATER, _HEATER_SELECTOR),
+    (CONF_SENSOR, _SENSOR_SELECTOR),
+    (CONF_SCHEDULE, _SCHEDULE_SELECTOR),
+    (CONF_OUTSIDE_SENSOR, _OUTSIDE_SELECTOR),
+)
+
+# Defaulted option fields as (key, fallback default, selector), in form order
+_TEMP_FIELDS = (
+    (CONF_COMFORT_TEMP, DEFAULT_COMFORT_TEMP, _TEMP_SELECTOR),
+    (CONF_SETBACK_TEMP, DEFAULT_SETBACK_TEMP, _TEMP_SELECTOR),
+    (CONF_HYSTERESIS, DEFAULT_HYSTERESIS, _HYSTERESIS_SELECTOR),
+)
+_TIME_FIELDS = (
+    (CONF_MAX_ON_TIME, DEFAULT_MAX_ON_TIME, _DURATION_SELECTOR),
+    (CONF_MAX_PREHEAT_TIME, DEFAULT_MAX_PREHEAT_TIME, _DURATION_SELECTOR),
+    (CONF_MIN_BURN_TIME, DEFAULT_MIN_BURN_TIME, _MIN_BURN_TIME_SELECTOR),
+    (CONF_MAX_HEAT_LOSS_TIME, DEFAULT_MAX_HEAT_LOSS_TIME, _MAX_HEAT_LOSS_TIME_SELECTOR),
+)
+_WEATHER_FIELDS = (
+    (CONF_WEATHER_SENSITIVITY, DEFAULT_WEATHER_SENSITIVITY, _WEATHER_SENSITIVITY_SELECTOR),
+)
+_TOGGLE_FIELDS = (
+    (CONF_ENABLE_PREHEAT, False, _TOGGLE_SELECTOR),
+    (CONF_ENABLE_OVERSHOOT, False, _TOGGLE_SELECTOR),
+    (CONF_ENABLE_LEARNING, False, _TOGGLE_SELECTOR),
+    (CONF_LEARN_FROM_HISTORY, False, _TOGGLE_SELECTOR),
+)
+_DEFAULTED_FIELDS = _TEMP_FIELDS + _TIME_FIELDS + _WEATHER_FIELDS + _TOGGLE_FIELDS
+
 class SmartHeatingConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Smart Learning Thermostat."""
     VERSION = 1
@@ -43,18 +121,7 @@ class SmartHeatingConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         return self.async_show_form(
             step_id="user",
-            data_schema=vol.Schema({
-                vol.Required("name", default="Smart Heating"): str,
-                vol.Required(CONF_HEATER): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain="switch")
-                ),
-                vol.Required(CONF_SENSOR): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain="sensor")
-                ),
-                vol.Optional(CONF_SCHEDULE): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain=["schedule", "calendar", "switch"])
-                ),
-            }),
+            data_schema=_user_schema(),
             errors=errors,
         )
 
@@ -76,85 +143,16 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         if user_input is not None:
             return self.async_create_entry(title="", data=user_input)
 
-        # Helper to get current value
-        def get_opt(key, default):
-            return self.config_entry.options.get(key, self.config_entry.data.get(key, default))
-
-        # --- 1. PREPARE CURRENT VALUES ---
-        heater_entity = get_opt(CONF_HEATER, None)
-        sensor_entity = get_opt(CONF_SENSOR, None)
-        schedule_entity = get_opt(CONF_SCHEDULE, None)
-        
-        comfort_temp = get_opt(CONF_COMFORT_TEMP, DEFAULT_COMFORT_TEMP)
-        setback_temp = get_opt(CONF_SETBACK_TEMP, DEFAULT_SETBACK_TEMP)
-        hysteresis = get_opt(CONF_HYSTERESIS, DEFAULT_HYSTERESIS)
-        
-        max_on_time = get_opt(CONF_MAX_ON_TIME, DEFAULT_MAX_ON_TIME)
-        max_preheat_time = get_opt(CONF_MAX_PREHEAT_TIME, DEFAULT_MAX_PREHEAT_TIME)
-        min_burn_time = get_opt(CONF_MIN_BURN_TIME, DEFAULT_MIN_BURN_TIME)
-        max_heat_loss_time = get_opt(CONF_MAX_HEAT_LOSS_TIME, DEFAULT_MAX_HEAT_LOSS_TIME)
-        
-        # --- NEW VALUES ---
-        outside_sensor = get_opt(CONF_OUTSIDE_SENSOR, None)
-        weather_sensitivity = get_opt(CONF_WEATHER_SENSITIVITY, DEFAULT_WEATHER_SENSITIVITY)
-        
-        enable_preheat = get_opt(CONF_ENABLE_PREHEAT, False)
-        enable_overshoot = get_opt(CONF_ENABLE_OVERSHOOT, False)
-        enable_learning = get_opt(CONF_ENABLE_LEARNING, False)
-
-        # --- 2. DEFINE THE SCHEMA ---
+        # --- 1. CURRENT VALUES (options override the original setup data) ---
+        current = ChainMap(self.config_entry.options, self.config_entry.data)
+
+        # --- 2. DEFINE THE SCHEMA (one vol.Schema build per render) ---
         schema = {
-            # --- Entities ---
-            vol.Optional(CONF_HEATER, description={"suggested_value": heater_entity}): selector.EntitySelector(
-                selector.EntitySelectorConfig(domain="switch")
-            ),
-            vol.Optional(CONF_SENSOR, description={"suggested_value": sensor_entity}): selector.EntitySelector(
-                selector.EntitySelectorConfig(domain="sensor")
-            ),
-            vol.Optional(CONF_SCHEDULE, description={"suggested_value": schedule_entity}): selector.EntitySelector(
-                selector.EntitySelectorConfig(domain=["schedule", "calendar", "switch"]) 
-            ),
-            
-            # --- NEW: Weather Source ---
-            vol.Optional(CONF_OUTSIDE_SENSOR, description={"suggested_value": outside_sensor}): selector.EntitySelector(
-                selector.EntitySelectorConfig(domain=["sensor", "weather"]) 
-            ),
-
-            # --- Temperatures ---
-            vol.Optional(CONF_COMFORT_TEMP, default=comfort_temp): selector.NumberSelector(
-                selector.NumberSelectorConfig(min=0, max=30, step=0.5, unit_of_measurement="°C", mode=selector.NumberSelectorMode.BOX)
-            ),
-            vol.Optional(CONF_SETBACK_TEMP, default=setback_temp): selector.NumberSelector(
-                selector.NumberSelectorConfig(min=0, max=30, step=0.5, unit_of_measurement="°C", mode=selector.NumberSelectorMode.BOX)
-            ),
-            vol.Optional(CONF_HYSTERESIS, default=hysteresis): selector.NumberSelector(
-                selector.NumberSelectorConfig(min=0.1, max=5.0, step=0.1, unit_of_measurement="°C", mode=selector.NumberSelectorMode.BOX)
-            ),
-
-            # --- Time Durations ---
-            vol.Optional(CONF_MAX_ON_TIME, default=max_on_time): selector.NumberSelector(
-                selector.NumberSelectorConfig(min=1, max=300, unit_of_measurement="min", mode=selector.NumberSelectorMode.BOX)
-            ),
-            vol.Optional(CONF_MAX_PREHEAT_TIME, default=max_preheat_time): selector.NumberSelector(
-                selector.NumberSelectorConfig(min=1, max=300, unit_of_measurement="min", mode=selector.NumberSelectorMode.BOX)
-            ),
-            vol.Optional(CONF_MIN_BURN_TIME, default=min_burn_time): selector.NumberSelector(
-                selector.NumberSelectorConfig(min=1, max=60, unit_of_measurement="min", mode=selector.NumberSelectorMode.BOX)
-            ),
-            vol.Optional(CONF_MAX_HEAT_LOSS_TIME, default=max_heat_loss_time): selector.NumberSelector(
-                selector.NumberSelectorConfig(min=60, max=1440, unit_of_measurement="min", mode=selector.NumberSelectorMode.BOX)
-            ),
-
-            # --- NEW: Sensitivity Slider ---
-            vol.Optional(CONF_WEATHER_SENSITIVITY, default=weather_sensitivity): selector.NumberSelector(
-                selector.NumberSelectorConfig(min=0, max=5.0, step=0.5, unit_of_measurement="%", mode=selector.NumberSelectorMode.SLIDER)
-            ),
-
-            # --- Toggles ---
-            vol.Optional(CONF_ENABLE_PREHEAT, default=enable_preheat): selector.BooleanSelector(),
-            vol.Optional(CONF_ENABLE_OVERSHOOT, default=enable_overshoot): selector.BooleanSelector(),
-            vol.Optional(CONF_ENABLE_LEARNING, default=enable_learning): selector.BooleanSelector(),
+            vol.Optional(key, description={"suggested_value": current.get(key)}): field_selector
+            for key, field_selector in _ENTITY_FIELDS
         }
+        for key, default, field_selector in _DEFAULTED_FIELDS:
+            schema[vol.Optional(key, default=current.get(key, default))] = field_selector
 
         return self.async_show_form(
             step_id="init",
@@ -1,39 +1,46 @@
+from typing import Final
+
 from homeassistant.const import Platform
 
-DOMAIN = "smart_learning_thermostat"
-PLATFORMS = [Platform.CLIMATE, Platform.SENSOR]
-
-CONF_HEATER = "heater_entity_id"
-CONF_SENSOR = "sensor_entity_id"
-CONF_SCHEDULE = "schedule_entity_id"
-
-CONF_ENABLE_PREHEAT = "enable_preheat"
-CONF_ENABLE_OVERSHOOT = "enable_overshoot"
-CONF_ENABLE_LEARNING = "enable_learning"
-
-CONF_MAX_ON_TIME = "max_on_time"
-CONF_MAX_PREHEAT_TIME = "max_preheat_time"
-CONF_HYSTERESIS = "hysteresis"
-CONF_MIN_BURN_TIME = "min_burn_time"
-CONF_MAX_HEAT_LOSS_TIME = "max_heat_loss_time"
-
-CONF_COMFORT_TEMP = "comfort_temp"
-CONF_SETBACK_TEMP = "setback_temp"
-
-CONF_OUTSIDE_SENSOR = "outside_sensor_entity_id"
-CONF_WEATHER_SENSITIVITY = "weather_sensitivity"
-
-DEFAULT_NAME = "Central Heating"
-DEFAULT_TARGET_TEMP = 20.0
-DEFAULT_HEAT_UP_RATE = 0.03
-DEFAULT_HEAT_LOSS_RATE = -0.02
-DEFAULT_OVERSHOOT = 0.0
-
-DEFAULT_HYSTERESIS = 0.2
-DEFAULT_MAX_ON_TIME = 300
-DEFAULT_MAX_PREHEAT_TIME = 180
-DEFAULT_MIN_BURN_TIME = 10
-DEFAULT_MAX_HEAT_LOSS_TIME = 360
-DEFAULT_COMFORT_TEMP = 20.0
-DEFAULT_SETBACK_TEMP = 15.0
-DEFAULT_WEATHER_SENSITIVITY = 2.0
+DOMAIN: Final = "smart_learning_thermostat"
+PLATFORMS: Final = [Platform.CLIMATE, Platform.SENSOR]
+
+CONF_HEATER: Final = "heater_entity_id"
+CONF_SENSOR: Final = "sensor_entity_id"
+CONF_SCHEDULE: Final = "schedule_entity_id"
+
+CONF_ENABLE_PREHEAT: Final = "enable_preheat"
+CONF_ENABLE_OVERSHOOT: Final = "enable_overshoot"
+CONF_ENABLE_LEARNING: Final = "enable_learning"
+CONF_LEARN_FROM_HISTORY: Final = "learn_from_history"
+
+CONF_MAX_ON_TIME: Final = "max_on_time"
+CONF_MAX_PREHEAT_TIME: Final = "max_preheat_time"
+CONF_HYSTERESIS: Final = "hysteresis"
+CONF_MIN_BURN_TIME: Final = "min_burn_time"
+CONF_MAX_HEAT_LOSS_TIME: Final = "max_heat_loss_time"
+
+CONF_COMFORT_TEMP: Final = "comfort_temp"
+CONF_SETBACK_TEMP: Final = "setback_temp"
+
+CONF_OUTSIDE_SENSOR: Final = "outside_sensor_entity_id"
+CONF_WEATHER_SENSITIVITY: Final = "weather_sensitivity"
+
+DEFAULT_NAME: Final = "Central Heating"
+DEFAULT_TARGET_TEMP: Final = 20.0
+DEFAULT_HEAT_UP_RATE: Final = 0.03
+DEFAULT_HEAT_LOSS_RATE: Final = -0.02
+# Seed heat rates are net (delta/duration) and already include losses, so the
+# model starts loss-free and only picks up a loss term from learned cycles
+DEFAULT_LOSS_COEFFICIENT: Final = 0.0
+DEFAULT_OVERSHOOT: Final = 0.0
+
+DEFAULT_HYSTERESIS: Final = 0.2
+DEFAULT_MAX_ON_TIME: Final = 300
+DEFAULT_MAX_PREHEAT_TIME: Final = 180
+DEFAULT_MIN_BURN_TIME: Final = 10
+DEFAULT_MAX_HEAT_LOSS_TIME: Final = 360
+DEFAULT_COMFORT_TEMP: Final = 20.0
+DEFAULT_SETBACK_TEMP: Final = 15.0
+DEFAULT_WEATHER_SENSITIVITY: Final = 2.0
+DEFAULT_HISTORY_DAYS: Final = 14
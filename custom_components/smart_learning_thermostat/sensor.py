@@ -3,76 +3,100 @@ from homeassistant.components.sensor import SensorEntity, SensorStateClass, Sens
 from homeassistant.const import UnitOfTemperature, UnitOfTime, STATE_ON
 from homeassistant.core import callback
 import homeassistant.helpers.entity_registry
-from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.helpers.event import async_track_state_change_event, async_track_time_change
 from homeassistant.util import dt as dt_util
 from datetime import datetime
+from typing import Final
 
 # Import constants to match climate.py and config_flow.py
 from .const import DOMAIN, CONF_SCHEDULE
 
+# (name suffix, climate attribute, unit, device class) per diagnostic sensor
+_DIAG_SENSORS: Final = (
+    ("Heat Up Rate", "learned_heat_up_rate", "°C/min", None),
+    ("Heat Loss Rate", "learned_heat_loss_rate", "°C/min", None),
+    ("Learned Overshoot", "learned_overshoot", "°C", SensorDeviceClass.TEMPERATURE),
+)
+
+# Climate attributes that feed the next-fire prediction
+_NEXT_FIRE_INPUTS = ("preset_mode", "boiler_active", "next_fire_timestamp")
+
+def _find_climate_entity_id(hass, entry_id):
+    """Find the climate entity created by this config entry in the entity registry."""
+    registry = homeassistant.helpers.entity_registry.async_get(hass)
+    entries = homeassistant.helpers.entity_registry.async_entries_for_config_entry(registry, entry_id)
+    return next((entry.entity_id for entry in entries if entry.domain == "climate"), None)
+
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up the diagnostic sensors."""
+    # One registry scan for all of the entry's sensors
+    climate_entity_id = _find_climate_entity_id(hass, config_entry.entry_id)
+
     async_add_entities([
-        HeatingDiagnosticSensor(config_entry, "Heat Up Rate", "learned_heat_up_rate", "°C/min"),
-        HeatingDiagnosticSensor(config_entry, "Heat Loss Rate", "learned_heat_loss_rate", "°C/min"),
-        HeatingDiagnosticSensor(config_entry, "Learned Overshoot", "learned_overshoot", "°C", SensorDeviceClass.TEMPERATURE),
-        NextFireSensor(config_entry),
+        *(HeatingDiagnosticSensor(config_entry, climate_entity_id, *spec) for spec in _DIAG_SENSORS),
+        NextFireSensor(config_entry, climate_entity_id),
     ])
 
 class HeatingDiagnosticSensor(SensorEntity):
     """Sensor that reads simple attributes from the main Climate entity."""
 
-    def __init__(self, config_entry, name_suffix, attribute, unit, device_class=None):
+    # Same for every instance; values are pushed from climate state changes
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_should_poll = False
+
+    def __init__(self, config_entry, climate_entity_id, name_suffix, attribute, unit, device_class=None):
         self._config_entry = config_entry
         self._attr_name = f"Smart Heating {name_suffix}"
         self._attr_unique_id = f"{config_entry.entry_id}_{attribute}"
         self._attribute = attribute
         self._attr_native_unit_of_measurement = unit
         self._attr_device_class = device_class
-        self._attr_state_class = SensorStateClass.MEASUREMENT
-        self._climate_entity_id = None
+        self._climate_entity_id = climate_entity_id
 
     async def async_added_to_hass(self):
         """Find parent climate entity and subscribe."""
-        registry = homeassistant.helpers.entity_registry.async_get(self.hass)
-        entries = homeassistant.helpers.entity_registry.async_entries_for_config_entry(
-            registry, self._config_entry.entry_id
-        )
-        for entry in entries:
-            if entry.domain == "climate":
-                self._climate_entity_id = entry.entity_id
-                break
+        if not self._climate_entity_id:
+            # Platforms set up concurrently; the climate entity may have registered since
+            self._climate_entity_id = _find_climate_entity_id(self.hass, self._config_entry.entry_id)
         
         if self._climate_entity_id:
+             self._attr_native_value = self._read_attribute(self.hass.states.get(self._climate_entity_id))
              self.async_on_remove(
                 async_track_state_change_event(
                     self.hass, [self._climate_entity_id], self._handle_climate_update
                 )
             )
 
-    @property
-    def native_value(self):
-        if not self._climate_entity_id: return None
-        state = self.hass.states.get(self._climate_entity_id)
-        if state and self._attribute in state.attributes:
-            return state.attributes[self._attribute]
-        return None
+    def _read_attribute(self, state):
+        return state.attributes.get(self._attribute) if state else None
 
     @callback
     def _handle_climate_update(self, event):
+        value = self._read_attribute(event.data["new_state"])
+        # The climate entity writes on every temperature step; learned values rarely move
+        if value == self._attr_native_value: return
+        self._attr_native_value = value
         self.async_write_ha_state()
 
 
 class NextFireSensor(SensorEntity):
     """Predicts exactly when the boiler will fire next."""
 
-    def __init__(self, config_entry):
+    # Event driven, plus a midnight refresh for the day-relative format
+    _attr_should_poll = False
+
+    def __init__(self, config_entry, climate_entity_id):
         self._config_entry = config_entry
         self._attr_name = "Smart Heating Next Fire Time"
         self._attr_unique_id = f"{config_entry.entry_id}_next_fire_time"
         self._attr_device_class = None 
         self._attr_icon = "mdi:clock-start"
-        self._climate_entity_id = None
+        self._climate_entity_id = climate_entity_id
+
+        # Parsed/formatted next_fire_timestamp, reused until the string or the day changes
+        self._last_ts_str = None
+        self._last_parsed = None
+        self._last_formatted = None # (date, display_str)
         
         # Determine schedule entity safely using the Constant
         self._schedule_entity_id = config_entry.options.get(
@@ -81,15 +105,12 @@ class NextFireSensor(SensorEntity):
 
     async def async_added_to_hass(self):
         """Link to climate entity."""
-        registry = homeassistant.helpers.entity_registry.async_get(self.hass)
-        entries = homeassistant.helpers.entity_registry.async_entries_for_config_entry(
-            registry, self._config_entry.entry_id
-        )
-        for entry in entries:
-            if entry.domain == "climate":
-                self._climate_entity_id = entry.entity_id
-                break
+        if not self._climate_entity_id:
+            # Platforms set up concurrently; the climate entity may have registered since
+            self._climate_entity_id = _find_climate_entity_id(self.hass, self._config_entry.entry_id)
         
+        self._attr_native_value = self._compute_value()
+
         # Track Climate Entity
         if self._climate_entity_id:
              self.async_on_remove(
@@ -106,43 +127,82 @@ class NextFireSensor(SensorEntity):
                 )
             )
 
-    @property
-    def native_value(self):
+        # A 'Day HH:MM' prediction becomes 'HH:MM' once that day arrives
+        self.async_on_remove(
+            async_track_time_change(self.hass, self._handle_midnight, hour=0, minute=0, second=0)
+        )
+
+    def _compute_value(self):
         if not self._climate_entity_id: return None
         state = self.hass.states.get(self._climate_entity_id)
         if not state: return None
 
+        attrs = state.attributes
+
         # 1. Check for Preheating (Priority)
-        if state.attributes.get("preset_mode") == "preheat":
+        if attrs.get("preset_mode") == "preheat":
             return "Preheating"
 
-        # 2. Check if we are inside the Schedule Window ("Now")
+        # 2. Check for Active Heating (Manual or otherwise) - in memory, so before the schedule lookup
+        if attrs.get("boiler_active") is True:
+            return "Now"
+
+        # 3. Check if we are inside the Schedule Window ("Now")
         if self._schedule_entity_id:
             sched_state = self.hass.states.get(self._schedule_entity_id)
             if sched_state and sched_state.state == STATE_ON:
                 return "Now"
 
-        # 3. Check for Active Heating (Manual or otherwise)
-        if state.attributes.get("boiler_active") is True:
-            return "Now"
-
         # 4. Future Prediction from Climate Entity
-        if "next_fire_timestamp" in state.attributes:
-            ts_str = state.attributes["next_fire_timestamp"]
-            if ts_str:
-                next_fire = dt_util.parse_datetime(ts_str)
-                if next_fire:
-                    now = dt_util.now()
-                    
-                    # Logic: If today -> "HH:MM", Else -> "Day HH:MM"
-                    if next_fire.date() == now.date():
-                        return next_fire.strftime("%H:%M")
-                    else:
-                        return next_fire.strftime("%a %H:%M")
+        ts_str = attrs.get("next_fire_timestamp")
+        if ts_str:
+            return self._format_next_fire(ts_str)
         
         return "Unknown"
 
+    def _format_next_fire(self, ts_str):
+        """Display string for the predicted fire time, parsed once per distinct timestamp."""
+        if ts_str != self._last_ts_str:
+            self._last_ts_str = ts_str
+            try:
+                # Written by our own climate entity via isoformat(), so the C parser almost always fits
+                self._last_parsed = datetime.fromisoformat(ts_str)
+            except (ValueError, TypeError):
+                self._last_parsed = dt_util.parse_datetime(ts_str)
+            self._last_formatted = None
+
+        next_fire = self._last_parsed
+        if not next_fire: return "Unknown"
+
+        today = dt_util.now().date()
+        if self._last_formatted is None or self._last_formatted[0] != today:
+            # Logic: If today -> "HH:MM", Else -> "Day HH:MM"
+            fmt = "%H:%M" if next_fire.date() == today else "%a %H:%M"
+            self._last_formatted = (today, next_fire.strftime(fmt))
+        return self._last_formatted[1]
+
     @callback
     def _handle_update(self, event):
         """Refresh sensor state when Climate or Schedule changes."""
+        data = event.data
+        if data["entity_id"] == self._climate_entity_id:
+            old_state, new_state = data["old_state"], data["new_state"]
+            if old_state and new_state and all(
+                old_state.attributes.get(key) == new_state.attributes.get(key) for key in _NEXT_FIRE_INPUTS
+            ):
+                return
+
+        self._refresh_value()
+
+    @callback
+    def _handle_midnight(self, now):
+        """Re-format the prediction relative to the new day."""
+        self._refresh_value()
+
+    @callback
+    def _refresh_value(self):
+        # Most climate writes (temperature ticks) leave the prediction untouched
+        value = self._compute_value()
+        if value == self._attr_native_value: return
+        self._attr_native_value = value
         self.async_write_ha_state()